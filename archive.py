@@ -0,0 +1,369 @@
+import json
+import os
+import struct
+import zlib
+from array import array
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from tile import Tile
+from game import Game
+from rules import Action, ACTION_CODES
+
+# 和牌方式编码，0 表示流局
+WIN_TYPE_CODES = {None: 0, "自摸": 1, "点炮": 2}
+
+NO_TILE = -1
+
+# 每局一行的列
+GAME_COLUMNS = {
+    "win_count": "B",     # 本局胡牌次数(血战到底可有多家)，流局为0
+    "action_count": "I",  # 本局动作数，累加即得到动作列中的起始位置
+}
+# 每次胡牌一行的列，按局顺序连续存放
+WIN_COLUMNS = {
+    "winner": "B",        # 赢家座位(0-3)
+    "win_type": "B",      # WIN_TYPE_CODES
+    "win_tile": "b",      # 和的那张牌的牌种
+}
+# 每个动作一行的列，按局顺序连续存放
+ACTION_COLUMNS = {
+    "seat": "B",          # 做动作的玩家座位
+    "action": "B",        # ACTION_CODES
+    "tile": "b",          # 动作涉及的牌种，无则为-1
+}
+# 二级索引：键 -> 包含该键的局号(段内编号，升序)；一局有多家胡牌时每家都建索引
+INDEXES = ["tile", "action", "win_type", "win_tile", "winner"]
+WIN_INDEXES = ("win_type", "win_tile", "winner")
+
+SEGMENT_MAGIC = b"MJARCH02"
+# 列数据取值范围小，低压缩级别的压缩率差别不大，但写入快得多
+COMPRESS_LEVEL = 1
+_FOOTER_SIZE = struct.Struct("<Q")
+
+
+def _tile_kind(tile: Union[Tile, int, None]) -> int:
+    if tile is None:
+        return NO_TILE
+    return tile.kind if isinstance(tile, Tile) else tile
+
+
+class ArchiveWriter:
+    """
+    列式对局归档的写入端。对局按 segment_games 局一段写成一个文件，
+    每列、每条索引分别用 zlib 压缩，段尾是记录各块位置的 JSON。
+    """
+
+    def __init__(self, directory: str, segment_games: int = 1 << 16):
+        self.directory = directory
+        self.segment_games = segment_games
+        os.makedirs(directory, exist_ok=True)
+        self.segment_index = len(_list_segments(directory))
+        self.first_game_id = sum(
+            _read_footer(path)["games"] for path in _list_segments(directory))
+        self._reset()
+
+    def _reset(self):
+        self.games = 0
+        self.columns: Dict[str, array] = {
+            name: array(code) for name, code in {**GAME_COLUMNS, **WIN_COLUMNS, **ACTION_COLUMNS}.items()}
+        self.indexes: Dict[str, Dict[int, array]] = {name: {} for name in INDEXES}
+
+    def _index(self, name: str, keys: Iterable[int]):
+        postings = self.indexes[name]
+        for key in keys:
+            if key not in postings:
+                postings[key] = array("I")
+            postings[key].append(self.games)
+
+    def add_game(self, seats: Sequence[int], actions: Sequence[int], tiles: Sequence[int],
+                 wins: Sequence[Tuple[int, str, int]] = ()) -> int:
+        """
+        追加一局，seats/actions/tiles 为等长的动作列，
+        wins 为按顺序的 (赢家座位, 和牌方式, 和的牌种)，流局为空；返回全局局号
+        """
+        count = len(actions)
+        if len(seats) != count or len(tiles) != count:
+            raise ValueError("seats、actions、tiles 长度必须一致")
+        win_type_codes = [WIN_TYPE_CODES[win_type] for _, win_type, _ in wins]
+        columns = self.columns
+        start = len(columns["action"])
+        columns["seat"].extend(seats)
+        columns["action"].extend(actions)
+        columns["tile"].extend(tiles)
+        columns["action_count"].append(count)
+        columns["win_count"].append(len(wins))
+        for (winner, _, win_tile), win_type_code in zip(wins, win_type_codes):
+            columns["winner"].append(winner)
+            columns["win_type"].append(win_type_code)
+            columns["win_tile"].append(win_tile)
+
+        self._index("tile", set(columns["tile"][start:]) - {NO_TILE})
+        self._index("action", set(columns["action"][start:]))
+        self._index("win_type", set(win_type_codes) or {WIN_TYPE_CODES[None]})
+        self._index("win_tile", {win_tile for _, _, win_tile in wins} - {NO_TILE})
+        self._index("winner", {winner for winner, _, _ in wins})
+
+        game_id = self.first_game_id + self.games
+        self.games += 1
+        if self.games == self.segment_games:
+            self.flush()
+        return game_id
+
+    def flush(self):
+        """把当前段写到磁盘"""
+        if not self.games:
+            return
+        path = os.path.join(self.directory, f"segment-{self.segment_index:06d}.mjar")
+        footer = {
+            "games": self.games,
+            "actions": len(self.columns["action"]),
+            "wins": len(self.columns["winner"]),
+            "first_game_id": self.first_game_id,
+            "columns": {},
+            "indexes": {name: {} for name in INDEXES},
+        }
+        with open(path + ".tmp", "wb") as f:
+            f.write(SEGMENT_MAGIC)
+
+            def write_block(data: array) -> list:
+                blob = zlib.compress(data.tobytes(), COMPRESS_LEVEL)
+                offset = f.tell()
+                f.write(blob)
+                return [offset, len(blob), data.typecode]
+
+            for name, data in self.columns.items():
+                footer["columns"][name] = write_block(data)
+            for name, postings in self.indexes.items():
+                for key, games in postings.items():
+                    # 局号升序，存差分后压缩效果更好
+                    deltas = array("I", (b - a for a, b in zip((0, *games), games)))
+                    footer["indexes"][name][str(key)] = write_block(deltas)
+            footer_bytes = json.dumps(footer).encode("utf-8")
+            f.write(footer_bytes)
+            f.write(_FOOTER_SIZE.pack(len(footer_bytes)))
+        os.replace(path + ".tmp", path)
+
+        self.segment_index += 1
+        self.first_game_id += self.games
+        self._reset()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArchiveRecorder:
+    """挂到 Game 上记录每个成功的动作，对局结束时写入 ArchiveWriter"""
+
+    def __init__(self, writer: ArchiveWriter):
+        self.writer = writer
+        self._games: Dict[Game, tuple] = {}
+        self._pending: Optional[tuple] = None
+
+    def attach(self, game: Game):
+        self._games[game] = (array("B"), array("B"), array("b"), [])
+        game.add_observer(self)
+
+    def before_command(self, game: Game, command: Dict):
+        action = command.get("action")
+        if action not in ACTION_CODES:
+            self._pending = None
+            return
+        tile = game.get_action_tile(command)
+        self._pending = (game.get_acting_player_index(), ACTION_CODES[action], _tile_kind(tile))
+
+    def after_command(self, game: Game, result: Dict):
+        pending, self._pending = self._pending, None
+        if pending is None or result["status"] != "success":
+            return
+        seats, actions, tiles, wins = self._games[game]
+        seats.append(pending[0])
+        actions.append(pending[1])
+        tiles.append(pending[2])
+
+        # 每次胡牌都会带 winner，血战到底时游戏还会继续
+        state = result["game_state"]
+        if "winner" in state:
+            names = [p.name for p in game.players]
+            wins.append((names.index(state["winner"]), state["win_type"], pending[2]))
+        if state.get("game_over"):
+            self.finish(game)
+
+    def finish(self, game: Game) -> int:
+        """结束记录一局（流局时直接调用），返回全局局号"""
+        game.remove_observer(self)
+        seats, actions, tiles, wins = self._games.pop(game)
+        return self.writer.add_game(seats, actions, tiles, wins)
+
+
+def _list_segments(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.endswith(".mjar")]
+
+
+def _read_footer(path: str) -> Dict:
+    with open(path, "rb") as f:
+        if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+            raise ValueError(f"不是对局归档文件: {path}")
+        f.seek(-_FOOTER_SIZE.size, os.SEEK_END)
+        (size,) = _FOOTER_SIZE.unpack(f.read(_FOOTER_SIZE.size))
+        f.seek(-_FOOTER_SIZE.size - size, os.SEEK_END)
+        return json.loads(f.read(size))
+
+
+class _Segment:
+    def __init__(self, path: str):
+        self.path = path
+        self.footer = _read_footer(path)
+        self.games = self.footer["games"]
+        self.first_game_id = self.footer["first_game_id"]
+
+    def _read_block(self, f, block: list) -> array:
+        offset, length, typecode = block
+        f.seek(offset)
+        data = array(typecode)
+        data.frombytes(zlib.decompress(f.read(length)))
+        return data
+
+    def columns(self, *names: str) -> List[array]:
+        """只读取并解压需要的列"""
+        with open(self.path, "rb") as f:
+            return [self._read_block(f, self.footer["columns"][name]) for name in names]
+
+    def postings(self, index: str, key: int) -> array:
+        block = self.footer["indexes"][index].get(str(key))
+        if block is None:
+            return array("I")
+        with open(self.path, "rb") as f:
+            return array("I", accumulate(self._read_block(f, block)))
+
+
+class ArchiveReader:
+    """
+    对局归档的查询端。find_games 只读取索引；统计类查询只解压用到的列，
+    并先用索引跳过不可能命中的段。
+    """
+
+    def __init__(self, directory: str):
+        self.segments = [_Segment(path) for path in _list_segments(directory)]
+
+    @property
+    def game_count(self) -> int:
+        return sum(segment.games for segment in self.segments)
+
+    def _matching_local_ids(self, segment: _Segment, filters: Dict[str, int]) -> Optional[List[int]]:
+        """按索引求交集，返回段内局号；没有任何条件时返回 None 表示全部"""
+        result = None
+        # 先用命中数最少的索引，交集越早变小越好
+        for name, key in sorted(filters.items(), key=lambda item: segment.footer["indexes"][item[0]]
+                                .get(str(item[1]), [0, 0])[1]):
+            games = segment.postings(name, key)
+            result = games if result is None else sorted(set(result).intersection(games))
+            if not result:
+                return []
+        return result
+
+    def _filters(self, win_type: Optional[str], win_tile, winner: Optional[int],
+                 action: Optional[str], tile) -> Dict[str, int]:
+        filters = {}
+        if win_type is not None:
+            filters["win_type"] = WIN_TYPE_CODES[win_type]
+        if win_tile is not None:
+            filters["win_tile"] = _tile_kind(win_tile)
+        if winner is not None:
+            filters["winner"] = winner
+        if action is not None:
+            filters["action"] = ACTION_CODES[action]
+        if tile is not None:
+            filters["tile"] = _tile_kind(tile)
+        return filters
+
+    def _same_win(self, segment: _Segment, local_ids: List[int], filters: Dict[str, int]) -> List[int]:
+        """多个胡牌条件必须由同一次胡牌满足：只对有多次胡牌的局回查胡牌列"""
+        win_filters = [(name, key) for name, key in filters.items() if name in WIN_INDEXES]
+        counts, *columns = segment.columns("win_count", *(name for name, _ in win_filters))
+        starts = array("I", accumulate(counts, initial=0))
+        return [
+            i for i in local_ids
+            if counts[i] <= 1 or any(
+                all(column[j] == key for column, (_, key) in zip(columns, win_filters))
+                for j in range(starts[i], starts[i + 1]))
+        ]
+
+    def find_games(self, win_type: Optional[str] = None, win_tile: Union[Tile, int, None] = None,
+                   winner: Optional[int] = None, action: Optional[str] = None,
+                   tile: Union[Tile, int, None] = None) -> List[int]:
+        """
+        按条件查找局号，例如点炮和七条：
+            find_games(win_type="点炮", win_tile=Tile(TileType.BAMBOO, 7))
+        """
+        filters = self._filters(win_type, win_tile, winner, action, tile)
+        check_same_win = sum(name in filters for name in WIN_INDEXES) > 1
+        game_ids = []
+        for segment in self.segments:
+            local_ids = self._matching_local_ids(segment, filters)
+            if local_ids is None:
+                local_ids = range(segment.games)
+            elif check_same_win and local_ids:
+                local_ids = self._same_win(segment, local_ids, filters)
+            game_ids.extend(segment.first_game_id + i for i in local_ids)
+        return game_ids
+
+    def count_games(self, **filters) -> int:
+        return len(self.find_games(**filters))
+
+    def turns_before_first(self, action: str) -> Iterator[int]:
+        """逐局给出首次出现 action 之前经过的回合数(打牌次数)，不含没有该动作的局"""
+        code = ACTION_CODES[action]
+        discard = ACTION_CODES[Action.DISCARD]
+        for segment in self.segments:
+            games = segment.postings("action", code)
+            if not games:
+                continue
+            counts, actions = segment.columns("action_count", "action")
+            starts = array("I", accumulate(counts, initial=0))
+            for i in games:
+                start, end = starts[i], starts[i + 1]
+                first = actions.index(code, start, end)
+                yield actions[start:first].count(discard)
+
+    def average_turns_before_first(self, action: str) -> Optional[float]:
+        """例如首次碰牌之前的平均回合数：average_turns_before_first("peng")"""
+        total = games = 0
+        for turns in self.turns_before_first(action):
+            total += turns
+            games += 1
+        return total / games if games else None
+
+    def get_game(self, game_id: int) -> Dict:
+        """读取一局的完整记录"""
+        for segment in self.segments:
+            if segment.first_game_id <= game_id < segment.first_game_id + segment.games:
+                i = game_id - segment.first_game_id
+                win_counts, counts, winner, win_type, win_tile, seats, actions, tiles = segment.columns(
+                    *GAME_COLUMNS, *WIN_COLUMNS, *ACTION_COLUMNS)
+                start = sum(counts[:i])
+                end = start + counts[i]
+                win_start = sum(win_counts[:i])
+                win_end = win_start + win_counts[i]
+                win_types = {code: name for name, code in WIN_TYPE_CODES.items()}
+                action_names = {code: name for name, code in ACTION_CODES.items()}
+                return {
+                    "game_id": game_id,
+                    "wins": [
+                        {"winner": winner[j], "win_type": win_types[win_type[j]], "win_tile": win_tile[j]}
+                        for j in range(win_start, win_end)
+                    ],
+                    "actions": [
+                        {"seat": seats[j], "action": action_names[actions[j]], "tile": tiles[j]}
+                        for j in range(start, end)
+                    ],
+                }
+        raise KeyError(game_id)
@@ -0,0 +1,89 @@
+import argparse
+import os
+import random
+import shutil
+import time
+from array import array
+from archive import ArchiveWriter, ArchiveReader, NO_TILE
+from rules import Action, ACTION_CODES
+from tile import Tile, TileType, KIND_COUNT
+
+_DRAW, _DISCARD = ACTION_CODES[Action.DRAW], ACTION_CODES[Action.DISCARD]
+_CLAIMS = [ACTION_CODES[Action.CHI], ACTION_CODES[Action.PENG], ACTION_CODES[Action.OPEN_GANG]]
+_PASSES = [ACTION_CODES[Action.PASS]] * 3
+_NO_TILES = [NO_TILE] * 3
+
+def make_game(rng: random.Random):
+    """生成一局模拟对局：动作序列 + 胡牌记录"""
+    seats, actions, tiles = array("B"), array("B"), array("b")
+    seat = 0
+    rounds = rng.randint(10, 70)
+    for kind, roll in zip(rng.choices(range(KIND_COUNT), k=rounds), rng.choices(range(100), k=rounds)):
+        seats.extend((seat, seat))
+        actions.extend((_DRAW, _DISCARD))
+        tiles.extend((NO_TILE, kind))
+        if roll < 8:
+            # 8% 的出牌被下家之后的某一家吃/碰/杠
+            responder = (seat + 1 + roll % 3) % 4
+            seats.append(responder)
+            actions.append(_CLAIMS[roll % 3])
+            tiles.append(kind)
+            seat = responder
+        else:
+            seats.extend(((seat + 1) % 4, (seat + 2) % 4, (seat + 3) % 4))
+            actions.extend(_PASSES)
+            tiles.extend(_NO_TILES)
+            seat = (seat + 1) % 4
+    outcome = rng.random()
+    if outcome < 0.2:
+        wins = []
+    else:
+        wins = [(rng.randrange(4), "点炮" if outcome < 0.6 else "自摸", rng.randrange(KIND_COUNT))]
+    return seats, actions, tiles, wins
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label}: {time.perf_counter() - start:.3f}s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="对局归档基准测试")
+    parser.add_argument("--games", type=int, default=2_000_000, help="写入的对局数")
+    parser.add_argument("--dir", default="bench_archive_data", help="归档目录(会被清空)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--templates", type=int, default=0,
+                        help="预先生成多少局模板并重复抽取(更快但数据重复度高)，0 表示每局单独生成")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    templates = [make_game(rng) for _ in range(args.templates)]
+    shutil.rmtree(args.dir, ignore_errors=True)
+
+    # 只统计写入耗时，不含生成模拟对局的时间
+    ingest_seconds = 0.0
+    with ArchiveWriter(args.dir) as writer:
+        for _ in range(args.games):
+            seats, actions, tiles, wins = rng.choice(templates) if templates else make_game(rng)
+            start = time.perf_counter()
+            writer.add_game(seats, actions, tiles, wins)
+            ingest_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+    ingest_seconds += time.perf_counter() - start
+    source = f"从 {args.templates} 局模板中重复抽取" if templates else "每局单独生成"
+    print(f"写入 {args.games} 局({source}): {ingest_seconds:.3f}s")
+    size = sum(os.path.getsize(os.path.join(args.dir, name)) for name in os.listdir(args.dir))
+    print(f"归档大小: {size / 1024 / 1024:.1f} MB")
+
+    reader = ArchiveReader(args.dir)
+    seven_bamboo = Tile(TileType.BAMBOO, 7)
+    games = timed("点炮和七条的对局", lambda: reader.find_games(win_type="点炮", win_tile=seven_bamboo))
+    print(f"  命中 {len(games)} 局")
+    games = timed("东家自摸且出现过碰牌的对局",
+                  lambda: reader.find_games(winner=0, win_type="自摸", action=Action.PENG))
+    print(f"  命中 {len(games)} 局")
+    average = timed("首次碰牌前的平均回合数", lambda: reader.average_turns_before_first(Action.PENG))
+    print(f"  平均 {average:.2f} 回合")
+
+if __name__ == "__main__":
+    main()
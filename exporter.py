@@ -0,0 +1,265 @@
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Optional
+from tile import KIND_COUNT
+from game import Game
+from player import MeldType
+from rules import Action, ACTION_CODES
+
+# 每个决策点导出一行定长 uint8 特征，布局如下（均以做决定的玩家为视角）：
+#   seat        1       做决定的玩家座位(0-3)
+#   hand_sizes  4       四家手牌张数
+#   hand        34      自己手牌中每种牌的张数
+#   discards    4*34    四家弃牌中每种牌的张数
+#   melds       4*34    四家副露中每种牌的张数(别家的暗杠看不到牌面，不计入)
+#   hidden_gangs 4      四家暗杠的个数
+#   unseen      34      自己看不到的每种牌的剩余张数
+#   last_tile   1       等待响应的那张打出的牌(无则为255)
+#   remaining   1       牌堆剩余张数
+FEATURE_LAYOUT = [
+    ("seat", 1),
+    ("hand_sizes", 4),
+    ("hand", KIND_COUNT),
+    ("discards", 4 * KIND_COUNT),
+    ("melds", 4 * KIND_COUNT),
+    ("hidden_gangs", 4),
+    ("unseen", KIND_COUNT),
+    ("last_tile", 1),
+    ("remaining", 1),
+]
+FEATURE_WIDTH = sum(width for _, width in FEATURE_LAYOUT)
+
+# 每行对应的标签：game_id、动作编码、动作涉及的牌种(无则为-1)、
+# 吃牌组成的顺子中最小的牌种(非吃牌为-1)。吃牌的 action_tile 是被吃的那张，
+# 同一张牌可能有三种吃法，要靠 chi_start 区分
+LABEL_WIDTH = 4
+_LABEL_STRUCT = struct.Struct("<4i")
+
+NO_TILE = 255
+
+_HAND = 5
+_DISCARDS = _HAND + KIND_COUNT
+_MELDS = _DISCARDS + 4 * KIND_COUNT
+_HIDDEN_GANGS = _MELDS + 4 * KIND_COUNT
+_UNSEEN = _HIDDEN_GANGS + 4
+_LAST_TILE = _UNSEEN + KIND_COUNT
+_REMAINING = _LAST_TILE + 1
+
+# .npy 头部固定为128字节，这样封存块时改写行数不会改变数据偏移
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_HEADER_SIZE = 128
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _npy_header(descr: str, shape: tuple) -> bytes:
+    header = repr({"descr": descr, "fortran_order": False, "shape": shape})
+    padding = _NPY_HEADER_SIZE - len(_NPY_MAGIC) - 2 - len(header) - 1
+    header = header + " " * padding + "\n"
+    return _NPY_MAGIC + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+def encode_features(game: Game, seat: int, row: bytearray):
+    """把 game 当前局面按 FEATURE_LAYOUT 写入 row（长度为 FEATURE_WIDTH，需预先清零）"""
+    row[0] = seat
+    # 从本规则实际使用的牌开始扣，不使用的花色始终为0
+    unseen = list(game.rules.tile_counts)
+
+    for i, player in enumerate(game.players):
+        row[1 + i] = len(player.hand)
+        base = _DISCARDS + i * KIND_COUNT
+        for tile in player.discarded:
+            row[base + tile.kind] += 1
+            unseen[tile.kind] -= 1
+        base = _MELDS + i * KIND_COUNT
+        for meld in player.melds:
+            if meld["type"] == MeldType.HIDDEN_GANG:
+                row[_HIDDEN_GANGS + i] += 1
+                if i != seat:
+                    continue
+            for tile in meld["tiles"]:
+                row[base + tile.kind] += 1
+                unseen[tile.kind] -= 1
+
+    for tile in game.players[seat].hand:
+        row[_HAND + tile.kind] += 1
+        unseen[tile.kind] -= 1
+
+    # 等待响应时这张牌仍在打出者的弃牌堆里，已经计入 discards
+    last_tile = game.last_discarded_tile
+    row[_LAST_TILE] = last_tile.kind if last_tile else NO_TILE
+    row[_REMAINING] = len(game.tiles)
+    row[_UNSEEN:_LAST_TILE] = bytes(unseen)
+
+
+class _NpyFile:
+    """预分配 capacity 行的二维 .npy 文件，通过 mmap 逐行写入"""
+
+    def __init__(self, path: str, descr: str, width: int, itemsize: int, capacity: int):
+        self.descr = descr
+        self.width = width
+        self.row_bytes = width * itemsize
+        with open(path, "wb") as f:
+            f.write(_npy_header(descr, (capacity, width)))
+            f.truncate(_NPY_HEADER_SIZE + capacity * self.row_bytes)
+        self.file = open(path, "r+b")
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+
+    def write_row(self, row: int, data: bytes):
+        offset = _NPY_HEADER_SIZE + row * self.row_bytes
+        self.mm[offset:offset + self.row_bytes] = data
+
+    def seal(self, rows: int):
+        """写回实际行数并截掉未使用的预分配空间"""
+        self.mm[:_NPY_HEADER_SIZE] = _npy_header(self.descr, (rows, self.width))
+        self.mm.flush()
+        self.mm.close()
+        self.file.truncate(_NPY_HEADER_SIZE + rows * self.row_bytes)
+        self.file.close()
+
+
+class _Chunk:
+    """一个块由 features 与 labels 两个 .npy 文件组成"""
+
+    def __init__(self, directory: str, index: int, capacity: int):
+        self.name = f"chunk-{index:06d}"
+        self.capacity = capacity
+        self.rows = 0
+        prefix = os.path.join(directory, self.name)
+        self.features = _NpyFile(f"{prefix}.features.npy", "|u1", FEATURE_WIDTH, 1, capacity)
+        self.labels = _NpyFile(f"{prefix}.labels.npy", "<i4", LABEL_WIDTH, 4, capacity)
+
+    def append(self, features: bytes, labels: bytes):
+        self.features.write_row(self.rows, features)
+        self.labels.write_row(self.rows, labels)
+        self.rows += 1
+
+    def seal(self):
+        self.features.seal(self.rows)
+        self.labels.seal(self.rows)
+
+
+class TrainingExporter:
+    """
+    自对弈训练数据导出器。作为观察者挂到 Game 上，每个成功执行的决策
+    导出一行定长特征(features)和标签(labels)，按块写入 .npy 文件，
+    可以直接用 numpy.load(path, mmap_mode="r") 读取。
+
+    内存占用只有当前一个块的 mmap；每封存一个块就原子地更新 manifest，
+    进程中断后用同一目录重新打开会从最后一个已封存的块之后继续。
+    多进程自对弈时每个进程使用各自的目录。
+    """
+
+    def __init__(self, directory: str, chunk_rows: int = 1 << 20):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self._chunk: Optional[_Chunk] = None
+        self._game_ids: Dict[Game, int] = {}
+        self._row = bytearray(FEATURE_WIDTH)
+        self._pending: Optional[tuple] = None
+        self._last_action: Optional[str] = None
+
+    def _load_manifest(self) -> Dict:
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["feature_width"] != FEATURE_WIDTH or len(manifest["label_columns"]) != LABEL_WIDTH:
+                raise ValueError("manifest 的特征布局与当前版本不一致")
+            return manifest
+        return {
+            "feature_layout": FEATURE_LAYOUT,
+            "feature_width": FEATURE_WIDTH,
+            "label_columns": ["game_id", "action", "action_tile", "chi_start"],
+            "actions": ACTION_CODES,
+            "ruleset": None,
+            "chunks": [],
+            "rows": 0,
+            "next_game_id": 0,
+        }
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def attach(self, game: Game) -> int:
+        """开始记录一局游戏，返回分配的 game_id。同一目录只能记录同一种规则的对局"""
+        ruleset = self.manifest.get("ruleset")
+        if ruleset is None:
+            self.manifest["ruleset"] = game.rules.name
+        elif ruleset != game.rules.name:
+            raise ValueError(f"目录中已是 {ruleset} 规则的数据，不能混入 {game.rules.name} 规则的对局")
+        game_id = self.manifest["next_game_id"]
+        self.manifest["next_game_id"] += 1
+        self._game_ids[game] = game_id
+        game.add_observer(self)
+        return game_id
+
+    def finish(self, game: Game):
+        """结束记录一局。胡牌结束和牌堆摸空时会自动调用，中途放弃的对局需要手动调用"""
+        game.remove_observer(self)
+        self._game_ids.pop(game, None)
+
+    def before_command(self, game: Game, command: Dict):
+        self._last_action = command.get("action")
+        action_code = ACTION_CODES.get(self._last_action)
+        if action_code is None:
+            self._pending = None
+            return
+        seat = game.get_acting_player_index()
+        row = self._row
+        row[:] = bytes(FEATURE_WIDTH)
+        encode_features(game, seat, row)
+        tile = game.get_action_tile(command)
+        chi_start = game.get_chi_start(command)
+        labels = _LABEL_STRUCT.pack(self._game_ids[game], action_code, tile.kind if tile else -1,
+                                    -1 if chi_start is None else chi_start)
+        self._pending = (bytes(row), labels)
+
+    def after_command(self, game: Game, result: Dict):
+        pending, self._pending = self._pending, None
+        if result["status"] != "success":
+            # 牌堆摸空即流局，释放这局游戏
+            if self._last_action == Action.DRAW and not game.tiles:
+                self.finish(game)
+            return
+        if pending is not None:
+            self._append(*pending)
+        if result["game_state"].get("game_over"):
+            self.finish(game)
+
+    def _append(self, features: bytes, labels: bytes):
+        if self._chunk is None:
+            self._chunk = _Chunk(self.directory, len(self.manifest["chunks"]), self.chunk_rows)
+        self._chunk.append(features, labels)
+        if self._chunk.rows == self._chunk.capacity:
+            self._seal_chunk()
+
+    def _seal_chunk(self):
+        chunk, self._chunk = self._chunk, None
+        chunk.seal()
+        self.manifest["chunks"].append({"name": chunk.name, "rows": chunk.rows})
+        self.manifest["rows"] += chunk.rows
+        self._write_manifest()
+
+    def close(self):
+        """封存未写满的块并写出 manifest"""
+        if self._chunk is not None and self._chunk.rows:
+            self._seal_chunk()
+        else:
+            self._write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,19 +1,31 @@
 import json
+import logging
 from typing import List, Optional, Dict
 import random
-from tile import Tile, create_tile_set, TileType
+from tile import Tile, create_tile_set
 from player import Player, Seat, MeldType
+from rules import Action, Ruleset, STANDARD
+
+logger = logging.getLogger(__name__)
 
 class Game:
-    def __init__(self):
+    def __init__(self, rules: Optional[Ruleset] = None):
+        self.rules = (rules or STANDARD).compile()
         self.players: List[Player] = []
         self.current_player_index = 0
         self.tiles: List[Tile] = []
         self.last_discarded_tile: Optional[Tile] = None
         self.waiting_player_index: Optional[int] = None
         self.players_waiting_response = []
+        # 已胡牌玩家的索引(血战到底时胡牌后退出，其余玩家继续)
+        self.winners: List[int] = []
+        # 吃/碰/明杠之后到摸牌或打牌之前为True，此时手里没有摸到的牌，不能自摸
+        self.just_claimed = False
+        # 观察者：before_command(game, command) / after_command(game, result)
+        self.observers = []
         self._initialize_players()
         self._initialize_game()
+        self._build_dispatch_tables()
     
     def _initialize_players(self):
         # Create 4 players with fixed wind positions
@@ -30,13 +42,77 @@ class Game:
 
     def _initialize_game(self):
         # Create and shuffle tiles
-        self.tiles = create_tile_set()
+        self.tiles = create_tile_set(self.rules.tile_types)
         
         # Deal 13 tiles to each player
         for _ in range(13):
             for player in self.players:
                 player.draw(self.tiles.pop())
     
+    def _build_dispatch_tables(self):
+        # 规则允许的动作 -> 处理方法，每局只建一次，处理指令时直接查表
+        response_handlers = {
+            Action.PASS: self._respond_pass,
+            Action.CHI: self._respond_chi,
+            Action.PENG: self._respond_peng,
+            Action.OPEN_GANG: self._respond_open_gang,
+            Action.HU: self._respond_hu,
+        }
+        turn_handlers = {
+            Action.DRAW: self._turn_draw,
+            Action.DISCARD: self._turn_discard,
+            Action.HIDDEN_GANG: self._turn_hidden_gang,
+            Action.HU: self._turn_hu,
+        }
+        self._response_handlers = {a: response_handlers[a] for a in self.rules.response_actions}
+        self._turn_handlers = {a: turn_handlers[a] for a in self.rules.turn_actions}
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def get_acting_player_index(self) -> int:
+        """当前需要做决定的玩家：等待响应时为下一个响应者，否则为当前玩家"""
+        if self.players_waiting_response:
+            return self.players_waiting_response[0]
+        return self.current_player_index
+
+    def get_action_tile(self, command: Dict) -> Optional[Tile]:
+        """
+        指令涉及的牌：打牌为打出的牌，暗杠为杠的牌，自摸为最后摸到的牌，
+        响应(吃/碰/明杠/点炮)为被响应的那张牌
+        """
+        action = command.get("action")
+        tile_index = command.get("tile_index")
+        hand = self.players[self.get_acting_player_index()].hand
+        if self.is_waiting_for_responses():
+            if action != Action.PASS:
+                return self.last_discarded_tile
+        elif action == Action.DISCARD:
+            if isinstance(tile_index, int) and 0 <= tile_index < len(hand):
+                return hand[tile_index]
+        elif action == Action.HIDDEN_GANG:
+            if isinstance(tile_index, list) and tile_index and isinstance(tile_index[0], int) \
+                    and 0 <= tile_index[0] < len(hand):
+                return hand[tile_index[0]]
+        elif action == Action.HU and hand and not self.just_claimed:
+            return hand[-1]
+        return None
+
+    def get_chi_start(self, command: Dict) -> Optional[int]:
+        """吃牌指令组成的顺子中最小的牌种，其他指令或牌不合法时为 None"""
+        tile_index = command.get("tile_index")
+        if command.get("action") != Action.CHI or not self.is_waiting_for_responses() \
+                or not isinstance(tile_index, list):
+            return None
+        hand = self.players[self.get_acting_player_index()].hand
+        if not all(isinstance(idx, int) and 0 <= idx < len(hand) for idx in tile_index):
+            return None
+        return min([hand[idx].kind for idx in tile_index] + [self.last_discarded_tile.kind])
+
     def get_current_player(self) -> Player:
         return self.players[self.current_player_index]
     
@@ -46,15 +122,21 @@ class Game:
         return None
     
     def next_player(self):
-        self.current_player_index = (self.current_player_index + 1) % 4
+        # 跳过已经胡牌的玩家
+        for i in range(1, 5):
+            index = (self.current_player_index + i) % 4
+            if index not in self.winners:
+                self.current_player_index = index
+                return
     
     def start_waiting_for_responses(self, discarded_tile: Tile):
         self.last_discarded_tile = discarded_tile
         self.waiting_player_index = self.current_player_index
-        # Create list of players to query in order, excluding the current player
+        # Create list of players to query in order, excluding the current player and winners
         self.players_waiting_response = [
             (self.current_player_index + i) % 4 
             for i in range(1, 4)
+            if (self.current_player_index + i) % 4 not in self.winners
         ]
     
     def get_next_waiting_player(self) -> Optional[Player]:
@@ -90,194 +172,208 @@ class Game:
                 "waiting_player": next_waiting_player.name
             })
         
+        if self.winners:
+            state["winners"] = [self.players[i].name for i in self.winners]
+        
         return state
     
     def handle_command(self, command_str: str) -> Dict:
         try:
             command = json.loads(command_str)
-            action = command.get("action", "")
-            tile_index = command.get("tile_index")
-            
-            current_player = self.get_current_player()
-            
-            # If we're waiting for responses from other players
-            if self.is_waiting_for_responses():
-                next_waiting_player = self.get_next_waiting_player()
-                # if current_player.name != next_waiting_player.name:
-                #     return {"status": "error", "message": f"等待 {next_waiting_player.name} 响应"}
-                
-                if action == "pass":
-                    self.handle_pass_response()
-                    next_player = self.get_next_waiting_player()
-                    if next_player:
-                        return {
-                            "status": "success", 
-                            "message": f"过，等待 {next_player.name} 响应",
-                            "game_state": self.get_game_state()
-                        }
-                    return {
-                        "status": "success",
-                        "message": "所有玩家均过",
-                        "game_state": self.get_game_state()
-                    }
-                elif action == "chi":
-                    tile_indices = command.get("tile_index", [])
-                    if not isinstance(tile_indices, list):
-                        return {"status": "error", "message": "吃牌需要指定两张手牌的索引"}
-                    
-                    if self.check_chi(next_waiting_player, tile_indices):
-                        self.execute_chi(next_waiting_player, tile_indices)
-                        return {
-                            "status": "success",
-                            "message": f"{next_waiting_player.name}吃牌成功，请出牌",
-                            "game_state": self.get_game_state()
-                        }
-                    return {"status": "error", "message": "无效的吃牌操作"}
-                    
-                elif action == "peng":
-                    tile_indices = command.get("tile_index", [])
-                    if not isinstance(tile_indices, list):
-                        return {"status": "error", "message": "碰牌需要指定两张手牌的索引"}
-                    
-                    if self.check_peng(next_waiting_player, tile_indices):
-                        self.execute_peng(next_waiting_player, tile_indices)
-                        return {
-                            "status": "success",
-                            "message": f"{next_waiting_player.name}碰牌成功，请出牌",
-                            "game_state": self.get_game_state()
-                        }
-                    return {"status": "error", "message": "无效的碰牌操作"}
-                elif action == "open_gang":
-                    tile_indices = command.get("tile_index", [])
-                    if not isinstance(tile_indices, list):
-                        return {"status": "error", "message": "明杠需要指定三张手牌的索引"}
-                    
-                    if self.check_open_gang(next_waiting_player, tile_indices):
-                        self.execute_open_gang(next_waiting_player, tile_indices)
-                        return {
-                            "status": "success",
-                            "message": f"{next_waiting_player.name}明杠成功，请继续操作",
-                            "game_state": self.get_game_state()
-                        }
-                    return {"status": "error", "message": "无效的明杠操作"}
-                elif action == "hu":
-                    # 检查是否能胡牌
-                    if self.check_hu(next_waiting_player, is_self_drawn=False):
-                        # 把当前打出的牌加入到胡牌玩家的手牌中
-                        next_waiting_player.draw(self.last_discarded_tile)
-                        # 从打出玩家的弃牌堆中移除这张牌
-                        discard_player = self.players[self.waiting_player_index]
-                        if discard_player.discarded and discard_player.discarded[-1] == self.last_discarded_tile:
-                            discard_player.discarded.pop()
-                        
-                        # 修改游戏状态，让所有玩家的手牌可见
-                        final_state = self.get_game_state()
-                        final_state["game_over"] = True
-                        final_state["winner"] = next_waiting_player.name
-                        final_state["win_type"] = "点炮"
-                        return {
-                            "status": "success",
-                            "message": f"恭喜 {next_waiting_player.name} 胡牌！",
-                            "game_state": final_state
-                        }
-                    return {"status": "error", "message": "不符合胡牌条件"}
-                else:
-                    return {"status": "error", "message": "只能选择 过、吃、碰、明杠、胡"}
-            
-            # Normal turn actions
-            if action == "draw":
-                tile = self.draw_tile()
-                if tile:
-                    current_player.draw(tile)
-                    # # 检查自摸胡牌
-                    # if self.check_hu(current_player, is_self_drawn=True):
-                    #     final_state = self.get_game_state()
-                    #     final_state["game_over"] = True
-                    #     final_state["winner"] = current_player.name
-                    #     final_state["win_type"] = "自摸"
-                    #     return {
-                    #         "status": "success",
-                    #         "message": f"恭喜 {current_player.name} 自摸！",
-                    #         "game_state": final_state
-                    #     }
-                    return {"status": "success", "message": "摸了一张牌", "game_state": self.get_game_state()}
-                return {"status": "error", "message": "牌堆已空"}
-            
-            elif action == "discard":
-                if tile_index is not None:
-                    tile = current_player.discard(tile_index)
-                    if tile:
-                        self.start_waiting_for_responses(tile)
-                        next_waiting_player = self.get_next_waiting_player()
-                        return {
-                            "status": "success", 
-                            "message": f"打出 {str(tile)}，等待 {next_waiting_player.name} 响应", 
-                            "game_state": self.get_game_state()
-                        }
-                return {"status": "error", "message": "无效的牌索引"}
-            
-            elif action == "hidden_gang":
-                tile_indices = command.get("tile_index", [])
-                if not isinstance(tile_indices, list):
-                    return {"status": "error", "message": "暗杠需要指定四张手牌的索引"}
-                
-                if self.check_hidden_gang(current_player, tile_indices):
-                    self.execute_hidden_gang(current_player, tile_indices)
-                    return {
-                        "status": "success",
-                        "message": "暗杠成功，请继续操作",
-                        "game_state": self.get_game_state()
-                    }
-                return {"status": "error", "message": "无效的暗杠操作"}
-            
-            elif action == "hu":
-                # 检查自摸胡牌
-                if self.check_hu(current_player, is_self_drawn=True):
-                    final_state = self.get_game_state()
-                    final_state["game_over"] = True
-                    final_state["winner"] = current_player.name
-                    final_state["win_type"] = "自摸"
-                    return {
-                        "status": "success",
-                        "message": f"恭喜 {current_player.name} 自摸！",
-                        "game_state": final_state
-                    }
-            
-            return {"status": "error", "message": "无效的指令"}
-        
         except json.JSONDecodeError:
             return {"status": "error", "message": "无效的JSON格式"}
+        if not isinstance(command, dict):
+            return {"status": "error", "message": "无效的指令"}
+        
+        self._notify_observers("before_command", command)
+        try:
+            result = self._execute_command(command)
         except Exception as e:
-            return {"status": "error", "message": str(e)}
+            result = {"status": "error", "message": str(e)}
+        self._notify_observers("after_command", result)
+        return result
 
-    def check_chi(self, player: Player, tiles_indices: List[int]) -> bool:
-        return True
-        # """检查吃牌操作是否合法"""
-        # # 检查数组长度
-        # if len(tiles_indices) != 2:
-        #     return False
-            
-        # # 确保索引有效
-        # if not all(0 <= idx < len(player.hand) for idx in tiles_indices):
-        #     return False
-            
-        # # 获取玩家选择的牌和上家打出的牌
-        # selected_tiles = [player.hand[idx] for idx in tiles_indices]
-        # discarded_tile = self.last_discarded_tile
+    def _notify_observers(self, callback: str, arg: Dict):
+        """观察者出错只记录日志，不能取消或中断玩家的操作"""
+        # 观察者可能在回调中移除自己，遍历副本
+        for observer in tuple(self.observers):
+            try:
+                getattr(observer, callback)(self, arg)
+            except Exception:
+                logger.exception("观察者 %r 的 %s 出错", observer, callback)
+
+    def _execute_command(self, command: Dict) -> Dict:
+        # If we're waiting for responses from other players
+        if self.is_waiting_for_responses():
+            handler = self._response_handlers.get(command.get("action", ""))
+            if handler is None:
+                return {"status": "error", "message": self.rules.response_error}
+            return handler(command)
         
-        # # 所有牌必须是同一种花色的数牌
-        # all_tiles = selected_tiles + [discarded_tile]
-        # tile_type = discarded_tile.tile_type
-        # if not all(t.tile_type == tile_type for t in all_tiles) or \
-        #    tile_type not in [TileType.CHARACTERS, TileType.DOTS, TileType.BAMBOO]:
-        #     return False
-            
-        # # 获取所有数字并排序
-        # numbers = sorted([t.number for t in all_tiles])
+        # Normal turn actions
+        handler = self._turn_handlers.get(command.get("action", ""))
+        if handler is None:
+            return {"status": "error", "message": "无效的指令"}
+        return handler(command)
+
+    def _respond_pass(self, command: Dict) -> Dict:
+        self.handle_pass_response()
+        next_player = self.get_next_waiting_player()
+        if next_player:
+            return {
+                "status": "success", 
+                "message": f"过，等待 {next_player.name} 响应",
+                "game_state": self.get_game_state()
+            }
+        return {
+            "status": "success",
+            "message": "所有玩家均过",
+            "game_state": self.get_game_state()
+        }
+
+    def _respond_chi(self, command: Dict) -> Dict:
+        next_waiting_player = self.get_next_waiting_player()
+        tile_indices = command.get("tile_index", [])
+        if not isinstance(tile_indices, list):
+            return {"status": "error", "message": "吃牌需要指定两张手牌的索引"}
+        
+        if self.check_chi(next_waiting_player, tile_indices):
+            self.execute_chi(next_waiting_player, tile_indices)
+            return {
+                "status": "success",
+                "message": f"{next_waiting_player.name}吃牌成功，请出牌",
+                "game_state": self.get_game_state()
+            }
+        return {"status": "error", "message": "无效的吃牌操作"}
+
+    def _respond_peng(self, command: Dict) -> Dict:
+        next_waiting_player = self.get_next_waiting_player()
+        tile_indices = command.get("tile_index", [])
+        if not isinstance(tile_indices, list):
+            return {"status": "error", "message": "碰牌需要指定两张手牌的索引"}
+        
+        if self.check_peng(next_waiting_player, tile_indices):
+            self.execute_peng(next_waiting_player, tile_indices)
+            return {
+                "status": "success",
+                "message": f"{next_waiting_player.name}碰牌成功，请出牌",
+                "game_state": self.get_game_state()
+            }
+        return {"status": "error", "message": "无效的碰牌操作"}
+
+    def _respond_open_gang(self, command: Dict) -> Dict:
+        next_waiting_player = self.get_next_waiting_player()
+        tile_indices = command.get("tile_index", [])
+        if not isinstance(tile_indices, list):
+            return {"status": "error", "message": "明杠需要指定三张手牌的索引"}
         
-        # # 检查是否构成顺子
-        # return numbers[1] == numbers[0] + 1 and numbers[2] == numbers[1] + 1
+        if self.check_open_gang(next_waiting_player, tile_indices):
+            self.execute_open_gang(next_waiting_player, tile_indices)
+            return {
+                "status": "success",
+                "message": f"{next_waiting_player.name}明杠成功，请继续操作",
+                "game_state": self.get_game_state()
+            }
+        return {"status": "error", "message": "无效的明杠操作"}
+
+    def _respond_hu(self, command: Dict) -> Dict:
+        next_waiting_player = self.get_next_waiting_player()
+        # 检查是否能胡牌
+        if self.check_hu(next_waiting_player, is_self_drawn=False):
+            # 把当前打出的牌加入到胡牌玩家的手牌中
+            next_waiting_player.draw(self.last_discarded_tile)
+            # 从打出玩家的弃牌堆中移除这张牌
+            discard_player = self.players[self.waiting_player_index]
+            if discard_player.discarded and discard_player.discarded[-1] == self.last_discarded_tile:
+                discard_player.discarded.pop()
+            return self._declare_win(next_waiting_player, "点炮", f"恭喜 {next_waiting_player.name} 胡牌！")
+        return {"status": "error", "message": "不符合胡牌条件"}
+
+    def _turn_draw(self, command: Dict) -> Dict:
+        tile = self.draw_tile()
+        if tile:
+            self.get_current_player().draw(tile)
+            self.just_claimed = False
+            return {"status": "success", "message": "摸了一张牌", "game_state": self.get_game_state()}
+        return {"status": "error", "message": "牌堆已空"}
+
+    def _turn_discard(self, command: Dict) -> Dict:
+        tile_index = command.get("tile_index")
+        if tile_index is not None:
+            tile = self.get_current_player().discard(tile_index)
+            if tile:
+                self.just_claimed = False
+                self.start_waiting_for_responses(tile)
+                next_waiting_player = self.get_next_waiting_player()
+                return {
+                    "status": "success", 
+                    "message": f"打出 {str(tile)}，等待 {next_waiting_player.name} 响应", 
+                    "game_state": self.get_game_state()
+                }
+        return {"status": "error", "message": "无效的牌索引"}
+
+    def _turn_hidden_gang(self, command: Dict) -> Dict:
+        current_player = self.get_current_player()
+        tile_indices = command.get("tile_index", [])
+        if not isinstance(tile_indices, list):
+            return {"status": "error", "message": "暗杠需要指定四张手牌的索引"}
+        
+        if self.check_hidden_gang(current_player, tile_indices):
+            self.execute_hidden_gang(current_player, tile_indices)
+            return {
+                "status": "success",
+                "message": "暗杠成功，请继续操作",
+                "game_state": self.get_game_state()
+            }
+        return {"status": "error", "message": "无效的暗杠操作"}
+
+    def _turn_hu(self, command: Dict) -> Dict:
+        current_player = self.get_current_player()
+        if self.just_claimed:
+            return {"status": "error", "message": "吃碰杠之后还没有摸牌，不能自摸"}
+        # 检查自摸胡牌
+        if self.check_hu(current_player, is_self_drawn=True):
+            return self._declare_win(current_player, "自摸", f"恭喜 {current_player.name} 自摸！")
+        return {"status": "error", "message": "不符合胡牌条件"}
+
+    def _declare_win(self, player: Player, win_type: str, message: str) -> Dict:
+        """记录胡牌；胡牌人数达到规则上限时结束游戏，否则其余玩家继续(血战到底)"""
+        self.winners.append(self.players.index(player))
+        if len(self.winners) < self.rules.max_winners:
+            self.waiting_player_index = None
+            self.last_discarded_tile = None
+            self.players_waiting_response.clear()
+            self.current_player_index = self.players.index(player)
+            self.next_player()
+            message = f"{player.name} 胡牌({win_type})，游戏继续"
+        
+        # 修改游戏状态，让所有玩家的手牌可见
+        state = self.get_game_state()
+        state["winner"] = player.name
+        state["win_type"] = win_type
+        if len(self.winners) >= self.rules.max_winners:
+            state["game_over"] = True
+        return {
+            "status": "success",
+            "message": message,
+            "game_state": state
+        }
+
+    def check_chi(self, player: Player, tiles_indices: List[int]) -> bool:
+        """检查吃牌操作是否合法"""
+        # 只能吃上家打出的牌
+        if self.players.index(player) != (self.waiting_player_index + 1) % 4:
+            return False
+        if not self._valid_indices(player, tiles_indices, 2):
+            return False
         
+        # 手里两张牌必须和打出的牌组成顺子，查预先算好的表
+        chi_pairs = self.rules.chi_pairs.get(self.last_discarded_tile.kind)
+        if not chi_pairs:
+            return False
+        kinds = sorted(player.hand[idx].kind for idx in tiles_indices)
+        return (kinds[0], kinds[1]) in chi_pairs
+
     def execute_chi(self, player: Player, tiles_indices: List[int]):
         """执行吃牌操作"""
         # 获取选中的牌
@@ -306,26 +402,12 @@ class Game:
         
         # 设置当前玩家为吃牌的玩家
         self.current_player_index = self.players.index(player)
+        self.just_claimed = True
 
     def check_peng(self, player: Player, tiles_indices: List[int]) -> bool:
-        return True
-        # """检查碰牌操作是否合法"""
-        # # 检查数组长度
-        # if len(tiles_indices) != 2:
-        #     return False
-            
-        # # 确保索引有效
-        # if not all(0 <= idx < len(player.hand) for idx in tiles_indices):
-        #     return False
-            
-        # # 获取玩家选择的牌和上家打出的牌
-        # selected_tiles = [player.hand[idx] for idx in tiles_indices]
-        # discarded_tile = self.last_discarded_tile
-        
-        # # 所有牌必须相同
-        # return all(t.tile_type == discarded_tile.tile_type and 
-        #           t.number == discarded_tile.number 
-        #           for t in selected_tiles)
+        """检查碰牌操作是否合法"""
+        return self._valid_indices(player, tiles_indices, 2) and \
+            all(player.hand[idx].kind == self.last_discarded_tile.kind for idx in tiles_indices)
 
     def execute_peng(self, player: Player, tiles_indices: List[int]):
         """执行碰牌操作"""
@@ -355,26 +437,14 @@ class Game:
         
         # 设置当前玩家为碰牌的玩家
         self.current_player_index = self.players.index(player)
+        self.just_claimed = True
 
     def check_hidden_gang(self, player: Player, tiles_indices: List[int]) -> bool:
-        return True
-        # """检查暗杠操作是否合法"""
-        # # 检查数组长度
-        # if len(tiles_indices) != 4:
-        #     return False
-            
-        # # 确保索引有效
-        # if not all(0 <= idx < len(player.hand) for idx in tiles_indices):
-        #     return False
-            
-        # # 获取玩家选择的牌
-        # selected_tiles = [player.hand[idx] for idx in tiles_indices]
-        # first_tile = selected_tiles[0]
-        
-        # # 所有牌必须相同
-        # return all(t.tile_type == first_tile.tile_type and 
-        #           t.number == first_tile.number 
-        #           for t in selected_tiles)
+        """检查暗杠操作是否合法"""
+        if not self._valid_indices(player, tiles_indices, 4):
+            return False
+        kind = player.hand[tiles_indices[0]].kind
+        return all(player.hand[idx].kind == kind for idx in tiles_indices)
 
     def execute_hidden_gang(self, player: Player, tiles_indices: List[int]):
         """执行暗杠操作"""
@@ -389,24 +459,9 @@ class Game:
         player.add_meld(MeldType.HIDDEN_GANG, selected_tiles)
 
     def check_open_gang(self, player: Player, tiles_indices: List[int]) -> bool:
-        return True
-        # """检查明杠操作是否合法"""
-        # # 检查数组长度
-        # if len(tiles_indices) != 3:
-        #     return False
-            
-        # # 确保索引有效
-        # if not all(0 <= idx < len(player.hand) for idx in tiles_indices):
-        #     return False
-            
-        # # 获取玩家选择的牌和上家打出的牌
-        # selected_tiles = [player.hand[idx] for idx in tiles_indices]
-        # discarded_tile = self.last_discarded_tile
-        
-        # # 所有牌必须相同
-        # return all(t.tile_type == discarded_tile.tile_type and 
-        #           t.number == discarded_tile.number 
-        #           for t in selected_tiles)
+        """检查明杠操作是否合法"""
+        return self._valid_indices(player, tiles_indices, 3) and \
+            all(player.hand[idx].kind == self.last_discarded_tile.kind for idx in tiles_indices)
 
     def execute_open_gang(self, player: Player, tiles_indices: List[int]):
         """执行明杠操作"""
@@ -436,6 +491,7 @@ class Game:
         
         # 设置当前玩家为明杠的玩家
         self.current_player_index = self.players.index(player)
+        self.just_claimed = True
 
     def check_hu(self, player: Player, is_self_drawn: bool = False) -> bool:
         """
@@ -445,85 +501,19 @@ class Game:
         all_tiles = player.hand.copy()
         if is_self_drawn:
             # 自摸时检查手牌
-            return self.is_hu(all_tiles)
+            return self.is_hu(all_tiles, player.melds)
         else:
             # 点炮时加入打出的牌
             if self.last_discarded_tile:
                 all_tiles.append(self.last_discarded_tile)
-                return self.is_hu(all_tiles)
+                return self.is_hu(all_tiles, player.melds)
         return False
 
-    def is_hu(self, tiles: List[Tile]) -> bool:
-        return True
-        # """
-        # 检查一手牌是否构成和牌
-        # 基本和牌规则：4组顺子或刻子 + 1对将牌
-        # """
-        # if len(tiles) != 14:  # 必须是14张牌
-        #     return False
-            
-        # # 对牌进行排序
-        # tiles.sort(key=lambda x: (x.tile_type.value, x.number))
-        
-        # # 枚举所有可能的将牌
-        # for i in range(len(tiles) - 1):
-        #     if i > 0 and tiles[i].tile_type == tiles[i-1].tile_type and tiles[i].number == tiles[i-1].number:
-        #         continue  # 跳过重复的将牌
-            
-        #     if i < len(tiles) - 1 and tiles[i].tile_type == tiles[i+1].tile_type and tiles[i].number == tiles[i+1].number:
-        #         # 找到一对将牌，创建剩余牌的副本
-        #         remain_tiles = tiles.copy()
-        #         # 移除将牌
-        #         remain_tiles.pop(i+1)
-        #         remain_tiles.pop(i)
-                
-        #         # 检查剩余牌是否能组成4组顺子或刻子
-        #         if self._can_form_melds(remain_tiles):
-        #             return True
-                    
-        # return False
-
-    def _can_form_melds(self, tiles: List[Tile]) -> bool:
-        """
-        检查给定的牌是否能组成顺子或刻子
-        """
-        if not tiles:  # 所有牌都已经组合完成
-            return True
-            
-        if len(tiles) < 3:  # 剩余牌不足3张
-            return False
-            
-        first_tile = tiles[0]
-        
-        # 尝试组成刻子
-        if (len(tiles) >= 3 and 
-            all(t.tile_type == first_tile.tile_type and t.number == first_tile.number 
-                for t in tiles[1:3])):
-            # 移除这个刻子后递归检查剩余的牌
-            return self._can_form_melds(tiles[3:])
-        
-        # 尝试组成顺子（仅对数字牌）
-        if (first_tile.tile_type in [TileType.CHARACTERS, TileType.DOTS, TileType.BAMBOO] and 
-            first_tile.number <= 7):  # 确保有足够的空间形成顺子
-            
-            # 查找后续两张牌
-            next_tiles = []
-            remaining = tiles[1:]
-            
-            for i in range(2):
-                found = False
-                for j, t in enumerate(remaining):
-                    if (t.tile_type == first_tile.tile_type and 
-                        t.number == first_tile.number + i + 1):
-                        next_tiles.append(t)
-                        remaining = remaining[:j] + remaining[j+1:]
-                        found = True
-                        break
-                if not found:
-                    break
-            
-            if len(next_tiles) == 2:  # 找到完整的顺子
-                new_tiles = remaining
-                return self._can_form_melds(new_tiles)
-        
-        return False
+    def is_hu(self, tiles: List[Tile], melds: Optional[List[Dict]] = None) -> bool:
+        """检查一手牌(不含副露)是否构成和牌，可和的牌型由规则决定"""
+        return self.rules.is_winning_hand(tiles, melds or [])
+
+    def _valid_indices(self, player: Player, tiles_indices: List[int], count: int) -> bool:
+        """索引数量正确、互不重复且都在手牌范围内"""
+        return len(tiles_indices) == count and len(set(tiles_indices)) == count and \
+            all(isinstance(idx, int) and 0 <= idx < len(player.hand) for idx in tiles_indices)
@@ -1,6 +1,7 @@
 import json
 import argparse
 from game import Game
+from rules import RULESETS, Action
 
 def format_tiles(tiles):
     return ", ".join(tile["display"] if isinstance(tile, dict) else str(tile) for tile in tiles)
@@ -38,30 +39,37 @@ def print_game_state_compact(game_state):
         print(f"  弃牌：{format_tiles(player['discarded'])}")
     print("-" * 50)
 
-def print_available_actions(game_state):
+ACTION_HELP = {
+    Action.PASS: "过：{'action': 'pass'}",
+    Action.CHI: "吃：{'action': 'chi', 'tile_index': [数字1, 数字2]}",
+    Action.PENG: "碰：{'action': 'peng', 'tile_index': [数字1, 数字2]}",
+    Action.OPEN_GANG: "明杠：{'action': 'open_gang', 'tile_index': [数字1, 数字2, 数字3]}",
+    Action.DRAW: "摸牌：{'action': 'draw'}",
+    Action.DISCARD: "打出：{'action': 'discard', 'tile_index': 数字}",
+    Action.HIDDEN_GANG: "暗杠：{'action': 'hidden_gang', 'tile_index': [数字1, 数字2, 数字3, 数字4]}",
+    Action.HU: "胡：{'action': 'hu'}",
+}
+
+def print_available_actions(game_state, rules):
     if game_state.get("game_over"):
         print("\n游戏已结束")
         return
         
     print("\n可用操作：")
     if game_state.get("waiting_response"):
-        print("1. 过：{'action': 'pass'}")
-        print("2. 吃：{'action': 'chi'}")
-        print("3. 碰：{'action': 'peng'}")
-        print("4. 明杠：{'action': 'open_gang', 'tile_index': [数字1, 数字2, 数字3]}")
-        print("5. 胡：{'action': 'hu'}")
+        for i, action in enumerate(rules.response_actions, 1):
+            print(f"{i}. {ACTION_HELP[action]}")
     else:
-        print("1. 摸牌：{'action': 'draw'}")
-        print("2. 打出：{'action': 'discard', 'tile_index': 数字}")
-        print("3. 暗杠：{'action': 'hidden_gang', 'tile_index': [数字1, 数字2, 数字3, 数字4]}")
-        print("4. 胡：{'action': 'hu'} (自摸)")
+        for i, action in enumerate(rules.turn_actions, 1):
+            print(f"{i}. {ACTION_HELP[action]}" + (" (自摸)" if action == Action.HU else ""))
 
 def main():
     parser = argparse.ArgumentParser(description="麻将游戏")
     parser.add_argument("--json", action="store_true", help="以JSON格式显示游戏状态")
+    parser.add_argument("--rules", choices=sorted(RULESETS), default="standard", help="规则变体")
     args = parser.parse_args()
 
-    game = Game()
+    game = Game(RULESETS[args.rules])
     if args.json:
         print(json.dumps(game.get_game_state(), ensure_ascii=False, indent=2))
     else:
@@ -84,7 +92,7 @@ def main():
             print(f"\n轮到 {game_state['waiting_player']} 响应")
         else:
             print(f"\n轮到 {game_state['current_player']} 行动")
-        print_available_actions(game_state)
+        print_available_actions(game_state, game.rules)
         
         command = input("请输入操作(JSON格式): ")
         result = game.handle_command(command)
@@ -99,7 +107,7 @@ def main():
                 print(f"\n错误：{result['message']}")
         
         # 如果游戏已结束，退出
-        if result["game_state"]["game_over"]:
+        if result.get("game_state", {}).get("game_over"):
             break
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+from tile import Tile, TileType, KIND_OFFSETS, KIND_COUNT
+
+class Action:
+    DRAW = "draw"
+    DISCARD = "discard"
+    PASS = "pass"
+    CHI = "chi"
+    PENG = "peng"
+    OPEN_GANG = "open_gang"
+    HIDDEN_GANG = "hidden_gang"
+    HU = "hu"
+
+# 动作的整数编码，导出训练数据等需要定长表示的地方使用
+ACTION_CODES = {
+    action: code for code, action in enumerate([
+        Action.DRAW, Action.DISCARD, Action.PASS, Action.CHI,
+        Action.PENG, Action.OPEN_GANG, Action.HIDDEN_GANG, Action.HU,
+    ])
+}
+
+ACTION_NAMES = {
+    Action.DRAW: "摸牌", Action.DISCARD: "打出", Action.PASS: "过", Action.CHI: "吃",
+    Action.PENG: "碰", Action.OPEN_GANG: "明杠", Action.HIDDEN_GANG: "暗杠", Action.HU: "胡",
+}
+
+SUIT_TYPES = (TileType.CHARACTERS, TileType.DOTS, TileType.BAMBOO)
+ALL_TILE_TYPES = SUIT_TYPES + (TileType.WIND, TileType.DRAGON)
+
+# 每种花色有几种牌
+_TYPE_SIZES = {TileType.CHARACTERS: 9, TileType.DOTS: 9, TileType.BAMBOO: 9, TileType.WIND: 4, TileType.DRAGON: 3}
+
+# 幺九牌和字牌，十三幺需要这13种牌各一张再加其中任意一对
+ORPHAN_KINDS = frozenset(
+    [KIND_OFFSETS[t] + n - 1 for t in SUIT_TYPES for n in (1, 9)]
+    + list(range(KIND_OFFSETS[TileType.WIND], KIND_COUNT))
+)
+
+
+class Ruleset:
+    """
+    一种规则变体的声明。只描述规则本身，Game 使用的是 compile() 之后的 CompiledRules。
+
+    tile_types:         使用哪些花色的牌
+    claims:             别人打牌后允许的响应(过总是允许的)
+    seven_pairs:        是否允许七对
+    thirteen_orphans:   是否允许十三幺
+    require_missing_suit: 是否必须缺一门才能胡牌
+    max_winners:        胡牌人数达到多少时结束(血战到底为3)
+    """
+
+    def __init__(self, name: str,
+                 tile_types: Sequence[TileType] = ALL_TILE_TYPES,
+                 claims: Sequence[str] = (Action.CHI, Action.PENG, Action.OPEN_GANG, Action.HU),
+                 seven_pairs: bool = False,
+                 thirteen_orphans: bool = False,
+                 require_missing_suit: bool = False,
+                 max_winners: int = 1):
+        self.name = name
+        self.tile_types = tuple(tile_types)
+        self.claims = tuple(claims)
+        self.seven_pairs = seven_pairs
+        self.thirteen_orphans = thirteen_orphans
+        self.require_missing_suit = require_missing_suit
+        self.max_winners = max_winners
+        self._compiled: Optional["CompiledRules"] = None
+
+    def compile(self) -> "CompiledRules":
+        if self._compiled is None:
+            self._compiled = CompiledRules(self)
+        return self._compiled
+
+
+def _build_suit_tables() -> Tuple[FrozenSet[int], FrozenSet[int]]:
+    """
+    预先枚举一门数牌(9种)所有能拆成若干顺子/刻子的张数组合，以及再加一对将的组合。
+    张数组合按5进制编码成整数，返回 (只有面子, 面子加一对将) 两张表。
+    """
+    melds = [tuple(3 if i == n else 0 for i in range(9)) for n in range(9)]
+    melds += [tuple(1 if n <= i < n + 3 else 0 for i in range(9)) for n in range(7)]
+    pairs = [tuple(2 if i == n else 0 for i in range(9)) for n in range(9)]
+
+    def add(counts, extra):
+        combined = tuple(a + b for a, b in zip(counts, extra))
+        return combined if max(combined) <= 4 else None
+
+    level = {(0,) * 9}
+    meld_shapes = set(level)
+    for _ in range(4):
+        level = {c for counts in level for meld in melds if (c := add(counts, meld))}
+        meld_shapes |= level
+    pair_shapes = {c for counts in meld_shapes for pair in pairs if (c := add(counts, pair))}
+
+    def encode(counts):
+        return sum(c * 5 ** i for i, c in enumerate(counts))
+
+    return frozenset(map(encode, meld_shapes)), frozenset(map(encode, pair_shapes))
+
+
+_SUIT_TABLES: Optional[Tuple[FrozenSet[int], FrozenSet[int]]] = None
+
+# 每种牌在所属花色编码中的权重；字牌不参与编码
+_KIND_WEIGHTS = [5 ** (kind % 9) if kind < 27 else 0 for kind in range(KIND_COUNT)]
+
+
+def suit_tables() -> Tuple[FrozenSet[int], FrozenSet[int]]:
+    global _SUIT_TABLES
+    if _SUIT_TABLES is None:
+        _SUIT_TABLES = _build_suit_tables()
+    return _SUIT_TABLES
+
+
+class CompiledRules:
+    """Ruleset 编译后的查表结构，每种规则只编译一次"""
+
+    def __init__(self, ruleset: Ruleset):
+        self.name = ruleset.name
+        self.tile_types = ruleset.tile_types
+        # 每种牌在牌堆中的张数，不使用的花色为0
+        in_play = {KIND_OFFSETS[t] + i for t in ruleset.tile_types for i in range(_TYPE_SIZES[t])}
+        self.tile_counts: Tuple[int, ...] = tuple(4 if kind in in_play else 0 for kind in range(KIND_COUNT))
+        self.max_winners = ruleset.max_winners
+        self.require_missing_suit = ruleset.require_missing_suit
+        self.seven_pairs = ruleset.seven_pairs
+        self.thirteen_orphans = ruleset.thirteen_orphans
+        # 别人打牌后可以做的动作 / 自己回合可以做的动作
+        self.response_actions: Tuple[str, ...] = (Action.PASS,) + ruleset.claims
+        self.turn_actions: Tuple[str, ...] = (Action.DRAW, Action.DISCARD, Action.HIDDEN_GANG, Action.HU)
+        self.response_error = "只能选择 " + "、".join(ACTION_NAMES[a] for a in self.response_actions)
+        # 被吃的牌种 -> 手里可以用来吃的两张牌种(升序)
+        self.chi_pairs: Dict[int, FrozenSet[Tuple[int, int]]] = {}
+        if Action.CHI in ruleset.claims:
+            for kind in range(27):
+                base = kind - kind % 9
+                self.chi_pairs[kind] = frozenset(
+                    (a, b) for a, b in ((kind - 2, kind - 1), (kind - 1, kind + 1), (kind + 1, kind + 2))
+                    if base <= a and b < base + 9)
+        self.meld_keys, self.pair_keys = suit_tables()
+
+    def is_standard_hand(self, kinds: List[int]) -> bool:
+        """手牌(不含副露)能否拆成若干面子加一对将"""
+        keys = [0, 0, 0]
+        honors = Counter()
+        for kind in kinds:
+            if kind < 27:
+                keys[kind // 9] += _KIND_WEIGHTS[kind]
+            else:
+                honors[kind] += 1
+
+        pairs = 0
+        for key in keys:
+            if key in self.pair_keys:
+                pairs += 1
+            elif key not in self.meld_keys:
+                return False
+        for count in honors.values():
+            if count == 2:
+                pairs += 1
+            elif count != 3:
+                return False
+        return pairs == 1
+
+    def is_winning_hand(self, hand: List[Tile], melds: List[Dict]) -> bool:
+        if len(hand) % 3 != 2:
+            return False
+        kinds = [tile.kind for tile in hand]
+
+        if self.require_missing_suit:
+            suits = {tile.tile_type for tile in hand}
+            suits.update(tile.tile_type for meld in melds for tile in meld["tiles"])
+            if all(suit in suits for suit in SUIT_TYPES):
+                return False
+
+        if self.is_standard_hand(kinds):
+            return True
+        if melds or len(kinds) != 14:
+            return False
+        counts = Counter(kinds)
+        if self.seven_pairs and all(count % 2 == 0 for count in counts.values()):
+            return True
+        if self.thirteen_orphans and len(counts) == 13 and counts.keys() == ORPHAN_KINDS:
+            return True
+        return False
+
+
+STANDARD = Ruleset("standard")
+# 国标：允许七对与十三幺(番数计算不在此处)
+GUOBIAO = Ruleset("guobiao", seven_pairs=True, thirteen_orphans=True)
+# 四川血战到底：只用万筒条，不能吃，必须缺一门，三家胡牌才结束
+SICHUAN = Ruleset("sichuan", tile_types=SUIT_TYPES,
+                  claims=(Action.PENG, Action.OPEN_GANG, Action.HU),
+                  seven_pairs=True, require_missing_suit=True, max_winners=3)
+# 家规：不能吃
+NO_CHI = Ruleset("no_chi", claims=(Action.PENG, Action.OPEN_GANG, Action.HU))
+
+RULESETS = {ruleset.name: ruleset for ruleset in (STANDARD, GUOBIAO, SICHUAN, NO_CHI)}
@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from game import Game
+
+
+def _frame(frame_type: bytes, seq: int, payload: bytes) -> bytes:
+    return b'{"type":"' + frame_type + b'","seq":' + str(seq).encode() + b',"state":' + payload + b'}'
+
+
+class Subscriber:
+    """一个观众的有界消息队列，由 SpectatorChannel 创建"""
+
+    def __init__(self, channel: "SpectatorChannel", max_queue: int):
+        self.channel = channel
+        self.max_queue = max_queue
+        self.queue: Deque[bytes] = deque()
+        # 队列溢出后丢弃积压的消息，下次读取时改发一份最新快照
+        self.needs_resync = True
+        self.resync_count = 0
+
+    def _push(self, frame: bytes):
+        if self.needs_resync:
+            return
+        if len(self.queue) >= self.max_queue:
+            self.queue.clear()
+            self.needs_resync = True
+            self.resync_count += 1
+            return
+        self.queue.append(frame)
+
+    def poll(self) -> List[bytes]:
+        """取出所有待发送的消息(JSON 编码的 bytes)"""
+        return self.channel._drain(self)
+
+    def close(self):
+        self.channel.unsubscribe(self)
+
+
+class SpectatorChannel:
+    """
+    一张牌桌的观战频道。作为观察者挂到 Game 上，每次成功的操作只序列化
+    一次游戏状态，所有观众共享同一个 bytes 对象，每多一个观众只多一次入队。
+
+    消息格式：{"type": "update" | "snapshot", "seq": 序号, "state": 游戏状态}
+    delay 大于0时，状态要延迟 delay 秒后才对观众可见（防作弊）。
+    """
+
+    def __init__(self, max_queue: int = 64, delay: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_queue = max_queue
+        self.delay = delay
+        self.clock = clock
+        self.subscribers: List[Subscriber] = []
+        self.seq = 0
+        self._lock = threading.Lock()
+        # 尚未到可见时间的消息：(可见时间, 序号, 状态 payload)
+        self._delayed: Deque[Tuple[float, int, bytes]] = deque()
+        # 观众可见的最新状态，用于新观众加入和慢观众重新同步
+        self._snapshot: Optional[Tuple[int, bytes]] = None
+        self._snapshot_frame: Optional[bytes] = None
+
+    def attach(self, game: Game):
+        game.add_observer(self)
+        self.publish(game.get_game_state())
+
+    def detach(self, game: Game):
+        game.remove_observer(self)
+
+    def before_command(self, game: Game, command: Dict):
+        pass
+
+    def after_command(self, game: Game, result: Dict):
+        # 复用 handle_command 已经生成的状态，不再额外调用 get_game_state
+        if result["status"] == "success":
+            self.publish(result["game_state"])
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self, self.max_queue)
+        with self._lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def publish(self, state: Dict):
+        payload = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self.seq += 1
+            if self.delay > 0:
+                self._delayed.append((self.clock() + self.delay, self.seq, payload))
+                self._release_due()
+            else:
+                self._fan_out(self.seq, payload)
+
+    def _release_due(self):
+        now = self.clock()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, seq, payload = self._delayed.popleft()
+            self._fan_out(seq, payload)
+
+    def _fan_out(self, seq: int, payload: bytes):
+        self._snapshot = (seq, payload)
+        self._snapshot_frame = None
+        frame = _frame(b"update", seq, payload)
+        for subscriber in self.subscribers:
+            subscriber._push(frame)
+
+    def _drain(self, subscriber: Subscriber) -> List[bytes]:
+        with self._lock:
+            if self._delayed:
+                self._release_due()
+            if subscriber.needs_resync:
+                if self._snapshot is None:
+                    return []
+                if self._snapshot_frame is None:
+                    # 同一时刻需要重新同步的观众共享同一份快照
+                    self._snapshot_frame = _frame(b"snapshot", *self._snapshot)
+                subscriber.needs_resync = False
+                return [self._snapshot_frame]
+            frames = list(subscriber.queue)
+            subscriber.queue.clear()
+            return frames
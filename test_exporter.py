@@ -0,0 +1,54 @@
+import json
+from array import array
+from exporter import FEATURE_WIDTH, LABEL_WIDTH, _HIDDEN_GANGS, _MELDS, _UNSEEN, _NPY_HEADER_SIZE, \
+    TrainingExporter, encode_features
+from game import Game
+from rules import ACTION_CODES
+from player import MeldType
+from tile import Tile, TileType, KIND_COUNT
+
+
+def features(game, seat):
+    row = bytearray(FEATURE_WIDTH)
+    encode_features(game, seat, row)
+    return row
+
+
+def test_opponent_hidden_gang_tiles_are_not_exposed():
+    game = Game()
+    for player in game.players:
+        player.hand = [Tile(TileType.CHARACTERS, n) for n in range(1, 10)]
+    gang = [Tile(TileType.BAMBOO, 7) for _ in range(4)]
+    game.players[1].add_meld(MeldType.HIDDEN_GANG, gang)
+    kind = gang[0].kind
+
+    # 别家只能看到暗杠的个数
+    row = features(game, 0)
+    assert row[_HIDDEN_GANGS + 1] == 1
+    assert row[_MELDS + KIND_COUNT + kind] == 0
+    assert row[_UNSEEN + kind] == 4
+
+    # 自己的暗杠照常计入
+    row = features(game, 1)
+    assert row[_HIDDEN_GANGS + 1] == 1
+    assert row[_MELDS + KIND_COUNT + kind] == 4
+    assert row[_UNSEEN + kind] == 0
+
+
+def test_chi_label_records_the_sequence(tmp_path):
+    game = Game()
+    game.players[1].hand[:2] = [Tile(TileType.CHARACTERS, 6), Tile(TileType.CHARACTERS, 7)]
+    with TrainingExporter(str(tmp_path)) as exporter:
+        exporter.attach(game)
+        game.handle_command(json.dumps({"action": "draw"}))
+        game.get_current_player().hand[0] = Tile(TileType.CHARACTERS, 5)
+        game.handle_command(json.dumps({"action": "discard", "tile_index": 0}))
+        result = game.handle_command(json.dumps({"action": "chi", "tile_index": [0, 1]}))
+        assert result["status"] == "success"
+
+    labels = array("i", (tmp_path / "chunk-000000.labels.npy").read_bytes()[_NPY_HEADER_SIZE:])
+    rows = [labels[i:i + LABEL_WIDTH].tolist() for i in range(0, len(labels), LABEL_WIDTH)]
+    five = Tile(TileType.CHARACTERS, 5).kind
+    # 5万被 6万7万 吃，顺子从5万开始
+    assert rows[-1] == [0, ACTION_CODES["chi"], five, five]
+    assert rows[0][3] == -1
@@ -0,0 +1,112 @@
+import json
+from game import Game
+from rules import NO_CHI, SICHUAN
+from tile import Tile, TileType
+
+
+def tiles(tile_type, numbers):
+    return [Tile(tile_type, n) for n in numbers]
+
+
+def command(game, **kwargs):
+    return game.handle_command(json.dumps(kwargs))
+
+
+def discard_to(game, tile):
+    """当前玩家摸一张牌后打出 tile"""
+    assert command(game, action="draw")["status"] == "success"
+    game.get_current_player().hand[0] = tile
+    return command(game, action="discard", tile_index=0)
+
+
+def test_no_self_drawn_win_right_after_peng():
+    game = Game()
+    game.players[2].hand = tiles(TileType.CHARACTERS, [5, 5, 1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 9])
+    discard_to(game, Tile(TileType.CHARACTERS, 5))
+    assert command(game, action="pass")["status"] == "success"
+    assert command(game, action="peng", tile_index=[0, 1])["status"] == "success"
+
+    result = command(game, action="hu")
+    assert result["status"] == "error"
+    assert game.winners == []
+
+    # 摸牌之后恢复正常
+    assert command(game, action="draw")["status"] == "success"
+    assert not game.just_claimed
+
+
+def test_same_hand_can_win_on_the_discard():
+    game = Game()
+    game.players[2].hand = tiles(TileType.CHARACTERS, [5, 5, 1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 9])
+    discard_to(game, Tile(TileType.CHARACTERS, 5))
+    command(game, action="pass")
+
+    result = command(game, action="hu")
+    assert result["status"] == "success"
+    assert result["game_state"]["win_type"] == "点炮"
+    assert result["game_state"]["game_over"]
+
+
+def test_chi_only_from_previous_seat():
+    game = Game()
+    game.players[1].hand[:2] = tiles(TileType.CHARACTERS, [3, 4])
+    game.players[2].hand[:2] = tiles(TileType.CHARACTERS, [3, 4])
+    discard_to(game, Tile(TileType.CHARACTERS, 5))
+
+    # 玩家2是下家，可以吃
+    result = command(game, action="chi", tile_index=[0, 1])
+    assert result["status"] == "success"
+    assert game.players[1].melds[0]["type"] == "chi"
+
+
+def test_chi_rejected_from_other_seats():
+    game = Game()
+    game.players[2].hand[:2] = tiles(TileType.CHARACTERS, [3, 4])
+    discard_to(game, Tile(TileType.CHARACTERS, 5))
+    command(game, action="pass")
+
+    # 玩家3不是出牌者的下家
+    assert command(game, action="chi", tile_index=[0, 1])["status"] == "error"
+    assert game.players[2].melds == []
+
+
+def test_chi_needs_a_sequence():
+    game = Game()
+    game.players[1].hand[:2] = tiles(TileType.CHARACTERS, [3, 7])
+    discard_to(game, Tile(TileType.CHARACTERS, 5))
+    assert command(game, action="chi", tile_index=[0, 1])["status"] == "error"
+
+
+def test_chi_not_allowed_under_no_chi_or_sichuan():
+    for rules in (NO_CHI, SICHUAN):
+        game = Game(rules)
+        game.players[1].hand[:2] = tiles(TileType.CHARACTERS, [3, 4])
+        discard_to(game, Tile(TileType.CHARACTERS, 5))
+        result = command(game, action="chi", tile_index=[0, 1])
+        assert result["status"] == "error"
+        assert "吃" not in result["message"]
+        assert game.players[1].melds == []
+
+
+def test_sichuan_continues_until_three_winners():
+    game = Game(SICHUAN)
+    winning_hand = tiles(TileType.CHARACTERS, [1, 2, 3, 4, 5, 6, 7, 8, 9]) + tiles(TileType.DOTS, [7, 7, 7, 5, 5])
+    winners = []
+    for round_number in range(3):
+        player = game.get_current_player()
+        assert command(game, action="draw")["status"] == "success"
+        player.hand = list(winning_hand)
+        result = command(game, action="hu")
+        assert result["status"] == "success"
+        winners.append(player.name)
+        assert result["game_state"]["winners"] == winners
+        if round_number < 2:
+            assert not result["game_state"].get("game_over")
+            # 胡牌的玩家之后不再轮到
+            assert game.get_current_player().name not in winners
+            discard_to(game, Tile(TileType.BAMBOO, 1))
+            assert all(game.players[i].name not in winners for i in game.players_waiting_response)
+            while game.is_waiting_for_responses():
+                command(game, action="pass")
+        else:
+            assert result["game_state"]["game_over"]
@@ -0,0 +1,113 @@
+import random
+from collections import Counter
+from functools import lru_cache
+from player import MeldType
+from rules import GUOBIAO, SICHUAN, STANDARD
+from tile import Tile, TileType, KIND_COUNT
+
+
+def tiles(tile_type, numbers):
+    return [Tile(tile_type, n) for n in numbers]
+
+
+@lru_cache(maxsize=None)
+def _can_form_melds(counts):
+    """逐张拆面子的朴素算法，用来校验预计算的表"""
+    first = next((kind for kind, count in enumerate(counts) if count), None)
+    if first is None:
+        return True
+    rest = list(counts)
+    if rest[first] >= 3:
+        rest[first] -= 3
+        if _can_form_melds(tuple(rest)):
+            return True
+        rest[first] += 3
+    if first < 27 and first % 9 <= 6 and rest[first + 1] and rest[first + 2]:
+        for kind in (first, first + 1, first + 2):
+            rest[kind] -= 1
+        return _can_form_melds(tuple(rest))
+    return False
+
+
+def brute_force_standard(kinds):
+    counts = [0] * KIND_COUNT
+    for kind in kinds:
+        counts[kind] += 1
+    for pair in range(KIND_COUNT):
+        if counts[pair] >= 2:
+            counts[pair] -= 2
+            if _can_form_melds(tuple(counts)):
+                return True
+            counts[pair] += 2
+    return False
+
+
+def random_winning_kinds(rng, melds):
+    counts = Counter()
+    kinds = []
+    while len(kinds) < 3 * melds + 2:
+        if len(kinds) == 3 * melds:
+            shape = [rng.randrange(KIND_COUNT)] * 2
+        elif rng.random() < 0.5:
+            shape = [rng.randrange(KIND_COUNT)] * 3
+        else:
+            start = rng.randrange(3) * 9 + rng.randrange(7)
+            shape = [start, start + 1, start + 2]
+        if all(counts[k] + shape.count(k) <= 4 for k in shape):
+            counts.update(shape)
+            kinds.extend(shape)
+    return kinds
+
+
+def test_standard_hand_table_matches_brute_force():
+    rules = STANDARD.compile()
+    rng = random.Random(0)
+    wall = [kind for kind in range(KIND_COUNT) for _ in range(4)]
+    hands = [rng.sample(wall, 3 * rng.randrange(5) + 2) for _ in range(3000)]
+    hands += [random_winning_kinds(rng, rng.randrange(5)) for _ in range(3000)]
+    for kinds in hands:
+        assert rules.is_standard_hand(kinds) == brute_force_standard(kinds), sorted(kinds)
+
+
+def test_basic_winning_hand():
+    hand = tiles(TileType.CHARACTERS, [1, 2, 3, 4, 5, 6]) + tiles(TileType.DOTS, [7, 7, 7]) \
+        + tiles(TileType.BAMBOO, [2, 3, 4]) + tiles(TileType.WIND, [1, 1])
+    assert STANDARD.compile().is_winning_hand(hand, [])
+    hand[0] = Tile(TileType.DRAGON, 1)
+    assert not STANDARD.compile().is_winning_hand(hand, [])
+
+
+def test_seven_pairs_only_in_guobiao():
+    hand = tiles(TileType.CHARACTERS, [1, 1, 3, 3, 5, 5]) + tiles(TileType.DOTS, [2, 2, 8, 8]) \
+        + tiles(TileType.BAMBOO, [4, 4]) + tiles(TileType.DRAGON, [1, 1])
+    assert GUOBIAO.compile().is_winning_hand(hand, [])
+    assert not STANDARD.compile().is_winning_hand(hand, [])
+
+
+def test_thirteen_orphans():
+    hand = tiles(TileType.CHARACTERS, [1, 9]) + tiles(TileType.DOTS, [1, 9]) \
+        + tiles(TileType.BAMBOO, [1, 9]) + tiles(TileType.WIND, [1, 2, 3, 4]) \
+        + tiles(TileType.DRAGON, [1, 2, 3, 3])
+    assert GUOBIAO.compile().is_winning_hand(hand, [])
+    assert not STANDARD.compile().is_winning_hand(hand, [])
+    # 缺一种幺九牌就不成立
+    hand[0] = Tile(TileType.CHARACTERS, 2)
+    assert not GUOBIAO.compile().is_winning_hand(hand, [])
+
+
+def test_sichuan_requires_a_missing_suit():
+    rules = SICHUAN.compile()
+    two_suits = tiles(TileType.CHARACTERS, [1, 2, 3, 4, 5, 6, 7, 8, 9]) + tiles(TileType.DOTS, [7, 7, 7, 5, 5])
+    assert rules.is_winning_hand(two_suits, [])
+
+    three_suits = tiles(TileType.CHARACTERS, [1, 2, 3, 4, 5, 6]) + tiles(TileType.DOTS, [7, 7, 7, 5, 5]) \
+        + tiles(TileType.BAMBOO, [2, 3, 4])
+    assert not rules.is_winning_hand(three_suits, [])
+    assert STANDARD.compile().is_winning_hand(three_suits, [])
+
+
+def test_sichuan_missing_suit_counts_melds():
+    rules = SICHUAN.compile()
+    hand = tiles(TileType.CHARACTERS, [1, 2, 3, 4, 5, 6]) + tiles(TileType.DOTS, [7, 7, 7, 5, 5])
+    assert rules.is_winning_hand(hand, [{"type": MeldType.PENG, "tiles": tiles(TileType.DOTS, [2, 2, 2])}])
+    assert not rules.is_winning_hand(hand, [{"type": MeldType.PENG, "tiles": tiles(TileType.BAMBOO, [2, 2, 2])}])
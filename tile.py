@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List
+from typing import Iterable, List, Optional
 import random
 
 class TileType(Enum):
@@ -9,10 +9,21 @@ class TileType(Enum):
     WIND = "风"        # 风牌
     DRAGON = "箭"      # 箭牌
 
+# 34种牌的编号起点：万0-8、筒9-17、条18-26、风27-30、箭31-33
+KIND_OFFSETS = {
+    TileType.CHARACTERS: 0,
+    TileType.DOTS: 9,
+    TileType.BAMBOO: 18,
+    TileType.WIND: 27,
+    TileType.DRAGON: 31,
+}
+KIND_COUNT = 34
+
 class Tile:
     def __init__(self, tile_type: TileType, number: int):
         self.tile_type = tile_type
         self.number = number
+        self.kind = KIND_OFFSETS[tile_type] + number - 1  # 牌种编号(0-33)
     
     def __str__(self) -> str:
         if self.tile_type in [TileType.CHARACTERS, TileType.DOTS, TileType.BAMBOO]:
@@ -32,24 +43,30 @@ class Tile:
             "display": str(self)
         }
 
-def create_tile_set() -> List[Tile]:
+def create_tile_set(tile_types: Optional[Iterable[TileType]] = None) -> List[Tile]:
+    """tile_types 为使用的花色，默认全部(四川麻将只用万筒条)"""
+    tile_types = set(tile_types) if tile_types is not None else set(TileType)
     tiles = []
     
     # Create number tiles (Characters, Dots, Bamboo)
     for tile_type in [TileType.CHARACTERS, TileType.DOTS, TileType.BAMBOO]:
+        if tile_type not in tile_types:
+            continue
         for number in range(1, 10):  # 1-9
             for _ in range(4):  # 4 of each
                 tiles.append(Tile(tile_type, number))
     
     # Create wind tiles
-    for number in range(1, 5):  # East(1), South(2), West(3), North(4)
-        for _ in range(4):
-            tiles.append(Tile(TileType.WIND, number))
+    if TileType.WIND in tile_types:
+        for number in range(1, 5):  # East(1), South(2), West(3), North(4)
+            for _ in range(4):
+                tiles.append(Tile(TileType.WIND, number))
     
     # Create dragon tiles
-    for number in range(1, 4):  # Red(1), Green(2), White(3)
-        for _ in range(4):
-            tiles.append(Tile(TileType.DRAGON, number))
+    if TileType.DRAGON in tile_types:
+        for number in range(1, 4):  # Red(1), Green(2), White(3)
+            for _ in range(4):
+                tiles.append(Tile(TileType.DRAGON, number))
     
     random.shuffle(tiles)
     return tiles